@@ -295,9 +295,23 @@ def retry_with_backoff(func, max_retries=3, base_delay=1):
 
 class AIProvider:
     """Base class for AI providers"""
+
+    # Cost of the most recent call on this instance. Per-instance (the web
+    # app builds a provider per request) so concurrent requests don't read
+    # each other's totals out of the global COST_TRACKER.
+    last_request_cost = 0.0
+
     def chat(self, messages: List[Dict], max_tokens: int = 4000) -> str:
         raise NotImplementedError
 
+    def stream(self, messages: List[Dict], max_tokens: int = 4000):
+        """Yield response chunks as they arrive.
+
+        Providers without native streaming fall back to yielding the
+        complete chat() reply as a single chunk.
+        """
+        yield self.chat(messages, max_tokens)
+
 class ClaudeProvider(AIProvider):
     """Anthropic Claude provider"""
     def __init__(self, api_key: str):
@@ -315,13 +329,30 @@ class ClaudeProvider(AIProvider):
                 messages=messages
             )
             # Track costs (approximate)
+            cost = (max_tokens / 1000) * 0.03  # ~$0.03 per 1K tokens
+            self.last_request_cost = cost
             COST_TRACKER["requests"] += 1
             COST_TRACKER["total_tokens"] += max_tokens
-            COST_TRACKER["total_cost"] += (max_tokens / 1000) * 0.03  # ~$0.03 per 1K tokens
+            COST_TRACKER["total_cost"] += cost
             return response.content[0].text
-        
+
         return retry_with_backoff(_call)
 
+    def stream(self, messages: List[Dict], max_tokens: int = 4000):
+        with self.client.messages.stream(
+            model="claude-3-5-sonnet-20241022",
+            max_tokens=max_tokens,
+            messages=messages
+        ) as stream:
+            for text in stream.text_stream:
+                yield text
+        # Track costs (approximate), same accounting as chat()
+        cost = (max_tokens / 1000) * 0.03
+        self.last_request_cost = cost
+        COST_TRACKER["requests"] += 1
+        COST_TRACKER["total_tokens"] += max_tokens
+        COST_TRACKER["total_cost"] += cost
+
 class OpenAIProvider(AIProvider):
     """OpenAI GPT provider"""
     def __init__(self, api_key: str, model: str = "gpt-4"):
@@ -338,8 +369,24 @@ class OpenAIProvider(AIProvider):
             messages=messages,
             max_tokens=max_tokens
         )
+        self.last_request_cost = (max_tokens / 1000) * MODEL_CAPABILITIES.get(
+            self.model, {}).get("cost_per_1k", 0.03)
         return response.choices[0].message.content
 
+    def stream(self, messages: List[Dict], max_tokens: int = 4000):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in response:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+        self.last_request_cost = (max_tokens / 1000) * MODEL_CAPABILITIES.get(
+            self.model, {}).get("cost_per_1k", 0.03)
+
 class OllamaProvider(AIProvider):
     """Local Ollama provider"""
     def __init__(self, model: str = "codellama", base_url: str = "http://localhost:11434"):
@@ -1203,7 +1250,7 @@ def collaborate_agents(initial_provider, initial_question, code_content=None, fi
         print(f"Agent: {current_role.upper()}", file=sys.stderr)
         
         # Get response from current agent
-        response, messages = chat_about_code(
+        response, messages, _ = chat_about_code(
             current_provider, current_question, code_content, filepath, messages, current_role
         )
         
@@ -1279,9 +1326,13 @@ def collaborate_agents(initial_provider, initial_question, code_content=None, fi
     
     return response, messages
 
-def chat_about_code(provider, question, code_content=None, filepath=None, messages=None, role=None):
-    """Send code and question to AI provider, get response"""
-    
+def build_chat_messages(question, code_content=None, filepath=None, messages=None, role=None):
+    """Build the message list for one chat turn.
+
+    Returns (messages, error): error is a user-facing string when the turn
+    must not proceed (e.g. coder role without a plan). Shared by
+    chat_about_code and streaming callers.
+    """
     # Start with existing context or empty list
     if messages is None:
         messages = []
@@ -1310,8 +1361,7 @@ Recommended workflow:
 1. ./codechat.py "Design your system" -r architect -o plan.md
 2. ./codechat.py -f plan.md "Implement this" -r coder -o implementation.py
 """
-            print(error_msg, file=sys.stderr)
-            return error_msg, messages
+            return messages, error_msg
     
     # If researcher role, perform actual research first
     if role == "researcher":
@@ -1342,22 +1392,95 @@ Recommended workflow:
     
     prompt_parts.append(question)
     prompt = "".join(prompt_parts)
-    
+
     # Add user message to context
     messages.append({"role": "user", "content": prompt})
-    
+    return messages, None
+
+def chat_about_code(provider, question, code_content=None, filepath=None, messages=None, role=None):
+    """Send code and question to AI provider; returns (response, messages, cost)
+
+    Cost comes from the provider instance rather than the global
+    COST_TRACKER, so concurrent callers never read each other's totals.
+    """
+    messages, error_msg = build_chat_messages(question, code_content, filepath, messages, role)
+    if error_msg:
+        print(error_msg, file=sys.stderr)
+        return error_msg, messages, 0.0
+
     try:
         response_text = provider.chat(messages)
-        
+
         # Apply role-based output filtering
         filtered_response = filter_output_by_role(response_text, role)
-        
+
         # Add filtered response to context
         messages.append({"role": "assistant", "content": filtered_response})
-        
-        return filtered_response, messages
+
+        return filtered_response, messages, getattr(provider, "last_request_cost", 0.0)
     except Exception as e:
-        return f"Error calling AI API: {e}", messages
+        return f"Error calling AI API: {e}", messages, 0.0
+
+def run(question, role=None, input_files=None, output=None, code_only=False,
+        messages=None, api_key=None, auto_doc=False):
+    """Programmatic entrypoint covering the workflow-runner subset of the CLI.
+
+    Handles role-based provider selection, input files, conversation
+    context, and output writing without a fork/exec plus interpreter
+    startup per call. Context is passed and returned as an in-memory
+    message list instead of round-tripping through a JSON file.
+
+    Returns (response, updated_messages). Provider/setup failures raise;
+    API errors come back as an error-text response like chat_about_code.
+    """
+    provider_name = 'claude'
+    model_name = None
+    if role and role in AGENT_ROLES:
+        role_config = AGENT_ROLES[role]
+        provider_name = role_config.get('preferred_provider', 'claude')
+        model_name = role_config.get('preferred_model')
+
+    if not api_key:
+        if provider_name == 'claude':
+            api_key = os.environ.get('ANTHROPIC_API_KEY')
+        elif provider_name == 'openai':
+            api_key = os.environ.get('OPENAI_API_KEY')
+
+    provider = get_provider(provider_name, api_key, model_name)
+
+    code_content = None
+    filepath = None
+    if input_files:
+        file_list, total_size = collect_files(list(input_files), False, [])
+        if file_list:
+            code_content, files_read, files_skipped, total_chars = read_multiple_files(file_list)
+            filepath = f"{len(files_read)} files"
+
+    response, updated_messages, _ = chat_about_code(
+        provider, question, code_content, filepath, messages, role)
+
+    # Mirror the CLI's --auto-doc behavior for coder steps
+    if auto_doc and role == "coder":
+        code_blocks = extract_code_blocks(response)
+        if code_blocks:
+            doc_code = "\n\n".join(code_blocks)
+            doc_question = "Generate comprehensive documentation for this code including docstrings, usage examples, and API reference"
+            doc_response, _, _ = chat_about_code(provider, doc_question, doc_code, "generated_code", None, "documenter")
+            doc_file = output.replace('.py', '_docs.md') if output else 'documentation.md'
+            if write_file(doc_file, doc_response):
+                print(f"✓ Documentation saved to {doc_file}", file=sys.stderr)
+
+    if output:
+        if code_only:
+            code_blocks = extract_code_blocks(response)
+            if code_blocks:
+                write_file(output, "\n\n".join(code_blocks))
+            else:
+                print("No code blocks found in response", file=sys.stderr)
+        else:
+            write_file(output, response)
+
+    return response, updated_messages
 
 def main():
     parser = argparse.ArgumentParser(
@@ -1862,7 +1985,7 @@ Examples:
             enhanced_question = f"Teaching mode: {enhanced_question}\nAsk questions to assess understanding before providing solutions."
         
         # Get response normally
-        response, updated_messages = chat_about_code(provider, enhanced_question, code_content, filepath, messages, args.role)
+        response, updated_messages, _ = chat_about_code(provider, enhanced_question, code_content, filepath, messages, args.role)
         
         # Auto-generate documentation if flag is set and role was coder
         if args.auto_doc and args.role == "coder":
@@ -1877,7 +2000,7 @@ Examples:
                 doc_question = "Generate comprehensive documentation for this code including docstrings, usage examples, and API reference"
                 
                 # Switch to documenter role
-                doc_response, _ = chat_about_code(provider, doc_question, doc_code, "generated_code", None, "documenter")
+                doc_response, _, _ = chat_about_code(provider, doc_question, doc_code, "generated_code", None, "documenter")
                 
                 # Save documentation
                 doc_file = args.output.replace('.py', '_docs.md') if args.output else 'documentation.md'
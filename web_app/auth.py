@@ -1,5 +1,6 @@
 """Simple email-based authentication with JWT tokens"""
 import os
+import time
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
@@ -14,6 +15,14 @@ ACCESS_TOKEN_EXPIRE_HOURS = 24 * 7  # 1 week
 
 security = HTTPBearer(auto_error=False)
 
+# Short TTL cache over verified tokens: the HMAC verify is cheap but polling
+# clients re-present the same bearer token many times per minute, and each
+# verify also costs a user lookup. 30s keeps revocation lag negligible
+# against the 1-week token lifetime.
+_TOKEN_CACHE_TTL = 30  # seconds
+_TOKEN_CACHE_MAX = 4096
+_token_cache: Dict[str, tuple] = {}  # token -> (expires_at, user payload)
+
 def create_access_token(data: Dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -27,9 +36,14 @@ def verify_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(s
     """Verify JWT token and return user data"""
     if not credentials:
         raise HTTPException(status_code=401, detail="No authentication token provided")
-    
+
+    token = credentials.credentials
+    cached = _token_cache.get(token)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("user_id")
         email = payload.get("email")
         
@@ -40,8 +54,12 @@ def verify_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(s
         user = get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        
-        return {"user_id": user_id, "email": email}
+
+        result = {"user_id": user_id, "email": email}
+        if len(_token_cache) >= _TOKEN_CACHE_MAX:
+            _token_cache.clear()
+        _token_cache[token] = (time.monotonic() + _TOKEN_CACHE_TTL, result)
+        return result
     
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -25,9 +25,17 @@ class Config:
         self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
         self.GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
         
+        # OpenAPI docs add startup time and resident memory; default them
+        # off whenever we're running in production
+        docs_default = "true" if self.is_production() else "false"
+        self.DISABLE_DOCS = os.getenv("DISABLE_DOCS", docs_default).lower() == "true"
+
         # Database
         self.DATABASE_PATH = os.getenv("DATABASE_PATH", "./data/sessions.db")
         self.RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "/var/nathan/rate_limits.db")
+
+        # Shared state for multi-worker deployments (empty = per-process dicts)
+        self.REDIS_URL = os.getenv("REDIS_URL", "")
         
         # Rate limiting
         self.MAX_REQUESTS_PER_IP_HOUR = int(os.getenv("MAX_REQUESTS_PER_IP_HOUR", "10"))
@@ -39,7 +47,7 @@ class Config:
         cors_str = os.getenv('CORS_ORIGINS', '["http://localhost:3000", "http://localhost:8000"]')
         try:
             self.CORS_ORIGINS = json.loads(cors_str)
-        except:
+        except json.JSONDecodeError:
             self.CORS_ORIGINS = ["http://localhost:3000", "http://localhost:8000"]
     
     def _load_or_generate_secrets(self):
@@ -52,7 +60,7 @@ class Config:
                     self.JWT_SECRET_KEY = secrets_data.get('jwt_secret')
                     self.ADMIN_PASSWORD = secrets_data.get('admin_password')
                     print("✅ Loaded existing secrets")
-            except Exception as e:
+            except (OSError, json.JSONDecodeError) as e:
                 print(f"⚠️ Failed to load secrets: {e}")
                 self._generate_new_secrets()
         else:
@@ -71,17 +79,29 @@ class Config:
         }
         
         try:
-            # Create file with restricted permissions
-            with open(self.secrets_file, 'w') as f:
-                json.dump(secrets_data, f, indent=2)
-            
-            # Set restrictive permissions (owner read/write only)
-            os.chmod(self.secrets_file, 0o600)
-            
+            # Write atomically: create a 0600 temp file, fsync it, then
+            # replace, so a crash never leaves a half-written or
+            # world-readable secrets file behind
+            tmp_file = self.secrets_file.with_suffix('.tmp')
+            # A crash between open and replace can leave a stale temp
+            # file; drop it so O_EXCL doesn't block every later save
+            tmp_file.unlink(missing_ok=True)
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(secrets_data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.secrets_file)
+            except OSError:
+                if tmp_file.exists():
+                    tmp_file.unlink()
+                raise
+
             print(f"✅ Generated new secrets")
             print(f"📝 Admin password: {self.ADMIN_PASSWORD}")
             print(f"   Save this password! It won't be shown again.")
-        except Exception as e:
+        except OSError as e:
             print(f"⚠️ Failed to save secrets: {e}")
     
     def get_api_key(self, provider: str) -> Optional[str]:
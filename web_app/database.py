@@ -1,18 +1,92 @@
 """Simple SQLite database operations for user accounts and sessions"""
 import sqlite3
 import json
+import msgpack
 import os
+import time
 from contextlib import contextmanager
 from typing import Optional, List, Dict
 from datetime import datetime
 
 DATABASE_URL = os.getenv("DATABASE_URL", "codechat.db")
 
+# Bump when the schema changes; stored in PRAGMA user_version so init_db()
+# can skip DDL and migrations on an already-initialized database
+SCHEMA_VERSION = 1
+
+# Module-level SQL constants so each call reuses one interned string and
+# long-lived connections can hit SQLite's prepared-statement cache
+_Q_CREATE_USERS = """
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        skill_levels TEXT DEFAULT '{}',
+        total_questions INTEGER DEFAULT 0,
+        total_cost REAL DEFAULT 0.0,
+        subscription_tier TEXT DEFAULT 'free'
+    )
+"""
+
+# conversation is a msgpack blob; X'90' = empty array
+_Q_CREATE_SESSIONS = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        conversation BLOB DEFAULT (X'90'),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_cost REAL DEFAULT 0.0,
+        title TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+"""
+
+_Q_LEGACY_CONVERSATIONS = "SELECT id, conversation FROM sessions WHERE typeof(conversation) = 'text'"
+_Q_MIGRATE_CONVERSATION = "UPDATE sessions SET conversation = ? WHERE id = ?"
+
+_Q_INSERT_USER = "INSERT INTO users (id, email) VALUES (?, ?)"
+_Q_GET_USER_BY_EMAIL = "SELECT * FROM users WHERE email = ?"
+_Q_GET_USER_BY_ID = "SELECT * FROM users WHERE id = ?"
+_Q_UPDATE_USER_STATS = """
+    UPDATE users
+    SET total_questions = total_questions + 1,
+        total_cost = total_cost + ?
+    WHERE id = ?
+"""
+
+_Q_INSERT_SESSION = "INSERT INTO sessions (id, user_id, title) VALUES (?, ?, ?)"
+_Q_GET_USER_SESSIONS = """
+    SELECT id, title, created_at, last_updated, total_cost
+    FROM sessions
+    WHERE user_id = ?
+    ORDER BY last_updated DESC
+    LIMIT ?
+"""
+_Q_GET_SESSION = "SELECT * FROM sessions WHERE id = ? AND user_id = ?"
+_Q_GET_CONVERSATION = "SELECT conversation FROM sessions WHERE id = ?"
+_Q_UPDATE_CONVERSATION = """
+    UPDATE sessions
+    SET conversation = ?,
+        last_updated = CURRENT_TIMESTAMP,
+        total_cost = total_cost + ?
+    WHERE id = ?
+"""
+
 @contextmanager
-def get_db():
-    """Get database connection with proper cleanup"""
+def get_db(row_factory: bool = True):
+    """Get database connection with proper cleanup
+
+    Write-only helpers pass row_factory=False to skip the sqlite3.Row
+    wrapper they never fetch through.
+    """
     conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access
+    if row_factory:
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+    # Serve reads from memory: mmap the file (1 GiB window) and give the
+    # page cache room (64 MiB) so hot tables don't hit disk
+    conn.execute("PRAGMA mmap_size=1073741824")
+    conn.execute("PRAGMA cache_size=-65536")
     try:
         yield conn
     finally:
@@ -21,156 +95,186 @@ def get_db():
 def init_db():
     """Create tables if they don't exist"""
     with get_db() as conn:
-        # Users table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                skill_levels TEXT DEFAULT '{}',
-                total_questions INTEGER DEFAULT 0,
-                total_cost REAL DEFAULT 0.0,
-                subscription_tier TEXT DEFAULT 'free'
-            )
-        """)
-        
-        # Sessions table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                conversation TEXT DEFAULT '[]',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_cost REAL DEFAULT 0.0,
-                title TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
+        # Fast path: schema already at the current version, skip the DDL
+        # entirely (matters with multiple workers re-importing on boot)
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+
+        conn.execute(_Q_CREATE_USERS)
+        conn.execute(_Q_CREATE_SESSIONS)
+
+        # One-time migration: conversations written before the msgpack switch
+        # are indented JSON text; repack them as compact blobs
+        legacy = conn.execute(_Q_LEGACY_CONVERSATIONS).fetchall()
+        for row in legacy:
+            conn.execute(
+                _Q_MIGRATE_CONVERSATION,
+                (_pack_conversation(json.loads(row['conversation'] or '[]')), row['id'])
             )
-        """)
-        
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         print("✅ Database initialized")
 
+def _pack_conversation(conversation: list) -> bytes:
+    """Encode a conversation as a compact msgpack blob"""
+    return msgpack.packb(conversation)
+
+def _unpack_conversation(raw) -> list:
+    """Decode a stored conversation (msgpack blob, or legacy JSON text)"""
+    if raw is None:
+        return []
+    if isinstance(raw, bytes):
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw or '[]')
+
+# Small TTL cache over user lookups: token verification hits these on every
+# authenticated request, but user rows change rarely. Rows are immutable so
+# sharing cached entries is safe. Only hits are cached; misses always go to
+# SQLite.
+_USER_CACHE_TTL = 60  # seconds
+_USER_CACHE_MAX = 4096
+_user_cache: Dict[tuple, tuple] = {}  # ('id'|'email', value) -> (expires_at, row)
+
+def _user_cache_get(key: tuple) -> Optional[sqlite3.Row]:
+    entry = _user_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _user_cache_put(key: tuple, row: sqlite3.Row):
+    if len(_user_cache) >= _USER_CACHE_MAX:
+        _user_cache.clear()
+    _user_cache[key] = (time.monotonic() + _USER_CACHE_TTL, row)
+
+def _user_cache_invalidate(user_id: str):
+    """Drop cached entries for a user after their row changes"""
+    stale = [key for key, (_, row) in _user_cache.items() if row['id'] == user_id]
+    for key in stale:
+        del _user_cache[key]
+
 def create_user(email: str) -> str:
     """Create new user and return user_id"""
     import uuid
     user_id = str(uuid.uuid4())
-    
-    with get_db() as conn:
-        conn.execute(
-            "INSERT INTO users (id, email) VALUES (?, ?)",
-            (user_id, email)
-        )
+
+    with get_db(row_factory=False) as conn:
+        conn.execute(_Q_INSERT_USER, (user_id, email))
         conn.commit()
-    
+
     return user_id
 
-def get_user_by_email(email: str) -> Optional[Dict]:
-    """Get user by email"""
+def get_user_by_email(email: str) -> Optional[sqlite3.Row]:
+    """Get user by email (Row supports dict-style access, no copy needed)"""
+    cached = _user_cache_get(('email', email))
+    if cached is not None:
+        return cached
+
     with get_db() as conn:
-        user = conn.execute(
-            "SELECT * FROM users WHERE email = ?", 
-            (email,)
-        ).fetchone()
-        
-        if user:
-            return dict(user)
-        return None
+        user = conn.execute(_Q_GET_USER_BY_EMAIL, (email,)).fetchone()
+
+    if user:
+        _user_cache_put(('email', email), user)
+    return user
+
+def get_user_by_id(user_id: str) -> Optional[sqlite3.Row]:
+    """Get user by ID (Row supports dict-style access, no copy needed)"""
+    cached = _user_cache_get(('id', user_id))
+    if cached is not None:
+        return cached
 
-def get_user_by_id(user_id: str) -> Optional[Dict]:
-    """Get user by ID"""
     with get_db() as conn:
-        user = conn.execute(
-            "SELECT * FROM users WHERE id = ?", 
-            (user_id,)
-        ).fetchone()
-        
-        if user:
-            return dict(user)
-        return None
+        user = conn.execute(_Q_GET_USER_BY_ID, (user_id,)).fetchone()
+
+    if user:
+        _user_cache_put(('id', user_id), user)
+    return user
 
 def update_user_stats(user_id: str, additional_cost: float = 0.0):
     """Update user statistics"""
-    with get_db() as conn:
-        conn.execute("""
-            UPDATE users 
-            SET total_questions = total_questions + 1,
-                total_cost = total_cost + ?
-            WHERE id = ?
-        """, (additional_cost, user_id))
+    with get_db(row_factory=False) as conn:
+        conn.execute(_Q_UPDATE_USER_STATS, (additional_cost, user_id))
         conn.commit()
 
+    # Counters are part of the cached row, so drop it
+    _user_cache_invalidate(user_id)
+
 def create_session(user_id: str, title: Optional[str] = None) -> str:
     """Create new session and return session_id"""
     import uuid
     session_id = str(uuid.uuid4())
-    
-    with get_db() as conn:
-        conn.execute("""
-            INSERT INTO sessions (id, user_id, title) 
-            VALUES (?, ?, ?)
-        """, (session_id, user_id, title))
+
+    with get_db(row_factory=False) as conn:
+        conn.execute(_Q_INSERT_SESSION, (session_id, user_id, title))
         conn.commit()
-    
+
     return session_id
 
-def get_user_sessions(user_id: str, limit: int = 50) -> List[Dict]:
-    """Get user's sessions"""
+def get_user_sessions(user_id: str, limit: int = 50) -> List[sqlite3.Row]:
+    """Get user's sessions as Rows; convert to dicts only at the serialization boundary"""
     with get_db() as conn:
-        sessions = conn.execute("""
-            SELECT id, title, created_at, last_updated, total_cost 
-            FROM sessions 
-            WHERE user_id = ? 
-            ORDER BY last_updated DESC 
-            LIMIT ?
-        """, (user_id, limit)).fetchall()
-        
-        return [dict(s) for s in sessions]
+        return conn.execute(_Q_GET_USER_SESSIONS, (user_id, limit)).fetchall()
 
 def get_session(session_id: str, user_id: str) -> Optional[Dict]:
     """Get specific session"""
     with get_db() as conn:
-        session = conn.execute("""
-            SELECT * FROM sessions 
-            WHERE id = ? AND user_id = ?
-        """, (session_id, user_id)).fetchone()
-        
+        session = conn.execute(_Q_GET_SESSION, (session_id, user_id)).fetchone()
+
         if session:
+            # Only the conversation field needs decoding; dict() here is the
+            # one place a copy is required
             session_dict = dict(session)
-            # Parse JSON conversation
-            session_dict['conversation'] = json.loads(session_dict.get('conversation', '[]'))
+            session_dict['conversation'] = _unpack_conversation(session_dict['conversation'])
             return session_dict
         return None
 
+def save_chat_turn(user_id: str, session_id: Optional[str], title: Optional[str],
+                   user_message: str, ai_response: str, cost: float = 0.0) -> str:
+    """Persist one chat turn for an authenticated user in a single transaction
+
+    Creates the session when session_id is None, appends the turn, and bumps
+    the user's stats - one connection and one commit instead of three.
+    """
+    with get_db() as conn:
+        if not session_id:
+            import uuid
+            session_id = str(uuid.uuid4())
+            conn.execute(_Q_INSERT_SESSION, (session_id, user_id, title))
+
+        result = conn.execute(_Q_GET_CONVERSATION, (session_id,)).fetchone()
+        conversation = _unpack_conversation(result['conversation']) if result else []
+        conversation.append({
+            'timestamp': datetime.now().isoformat(),
+            'user_message': user_message,
+            'ai_response': ai_response,
+            'cost': cost
+        })
+
+        conn.execute(_Q_UPDATE_CONVERSATION, (_pack_conversation(conversation), cost, session_id))
+        conn.execute(_Q_UPDATE_USER_STATS, (cost, user_id))
+        conn.commit()
+
+    _user_cache_invalidate(user_id)
+    return session_id
+
 def add_to_conversation(session_id: str, user_message: str, ai_response: str, cost: float = 0.0):
     """Add conversation turn to session"""
     with get_db() as conn:
         # Get current conversation
-        result = conn.execute(
-            "SELECT conversation FROM sessions WHERE id = ?", 
-            (session_id,)
-        ).fetchone()
-        
+        result = conn.execute(_Q_GET_CONVERSATION, (session_id,)).fetchone()
+
         if result:
-            conversation = json.loads(result['conversation'] or '[]')
+            conversation = _unpack_conversation(result['conversation'])
             conversation.append({
                 'timestamp': datetime.now().isoformat(),
                 'user_message': user_message,
                 'ai_response': ai_response,
                 'cost': cost
             })
-            
-            # Update session
-            conn.execute("""
-                UPDATE sessions 
-                SET conversation = ?, 
-                    last_updated = CURRENT_TIMESTAMP,
-                    total_cost = total_cost + ?
-                WHERE id = ?
-            """, (json.dumps(conversation), cost, session_id))
-            
+
+            conn.execute(_Q_UPDATE_CONVERSATION, (_pack_conversation(conversation), cost, session_id))
             conn.commit()
 
 # Initialize database on import
 if __name__ != "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
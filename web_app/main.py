@@ -1,4 +1,8 @@
 """FastAPI wrapper around the proven codechat CLI functionality"""
+import asyncio
+import functools
+import hmac
+import io
 import sys
 import os
 import tempfile
@@ -7,9 +11,13 @@ import uuid
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request
+from contextlib import asynccontextmanager
+
+import aiofiles
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
 from datetime import datetime
 from dotenv import load_dotenv
@@ -20,39 +28,58 @@ load_dotenv()
 # Add parent directory to path to import codechat
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models import (ChatRequest, ChatResponse, AgentListResponse, AgentInfo, SessionResponse, 
+from models import (ChatRequest, ChatResponse, AgentListResponse, AgentInfo, SessionResponse,
                     UploadResponse, WorkflowRequest, WorkflowResponse, LoginRequest, LoginResponse,
                     UserResponse, SessionListResponse, SessionDetailResponse)
 
-# Import our proven CLI functionality
+# Lightweight imports needed at route-definition time
 try:
-    from codechat import AGENT_ROLES, chat_about_code, get_provider, COST_TRACKER
-    import workflow  # Import workflow runner
     from auth import authenticate_user, verify_token, get_current_user_optional
-    from database import (init_db, create_session, get_user_sessions, get_session, 
-                         add_to_conversation, update_user_stats)
+    from database import init_db, get_user_sessions, get_session, save_chat_turn
     from demo_mode import is_demo_mode, get_demo_provider, DEMO_RESPONSES
-    from rate_limiter_persistent import rate_limiter
+    from rate_limiter_persistent import get_rate_limiter
     from config import config
-    print("✅ Successfully imported codechat functionality")
+    from session_store import SessionStore
 except ImportError as e:
     print(f"❌ Failed to import codechat: {e}")
     sys.exit(1)
 
-# Environment configuration with validation
+# The codechat CLI module drags in the anthropic/openai/requests clients, so
+# it is imported lazily on first use instead of before Uvicorn binds the port
+AGENT_ROLES = None
+chat_about_code = None
+build_chat_messages = None
+get_provider = None
+
+def _load_codechat():
+    """Import codechat on first use and cache its symbols at module level"""
+    global AGENT_ROLES, chat_about_code, build_chat_messages, get_provider
+    if AGENT_ROLES is None:
+        import codechat
+        AGENT_ROLES = codechat.AGENT_ROLES
+        chat_about_code = codechat.chat_about_code
+        build_chat_messages = codechat.build_chat_messages
+        get_provider = codechat.get_provider
+        print("✅ Successfully imported codechat functionality")
+
+# Environment configuration with validation.
+# Provider keys are resolved once after load_dotenv() so the chat hot path
+# is a single dict lookup instead of repeated os.getenv calls.
+_API_KEYS = {
+    'anthropic': os.getenv('ANTHROPIC_API_KEY'),
+    'claude': os.getenv('ANTHROPIC_API_KEY'),
+    'openai': os.getenv('OPENAI_API_KEY'),
+    'google': os.getenv('GOOGLE_API_KEY')
+}
+
+# First provider with a configured key, used as the fallback
+_DEFAULT_PROVIDER = next(
+    (p for p in ('anthropic', 'openai', 'google') if _API_KEYS.get(p)), None
+)
+
 def get_api_key(provider: str) -> Optional[str]:
-    """Get API key for specified provider with fallback"""
-    key_map = {
-        'anthropic': 'ANTHROPIC_API_KEY',
-        'claude': 'ANTHROPIC_API_KEY',
-        'openai': 'OPENAI_API_KEY',
-        'google': 'GOOGLE_API_KEY'
-    }
-    
-    env_key = key_map.get(provider.lower())
-    if env_key:
-        return os.getenv(env_key)
-    return None
+    """Get API key for specified provider"""
+    return _API_KEYS.get(provider.lower())
 
 def validate_environment():
     """Validate that at least one API key is available"""
@@ -73,11 +100,12 @@ def validate_environment():
         print(f"✅ API keys found for: {', '.join(available_keys)}")
         return True
 
-# Validate environment on startup
-validate_environment()
-
-# Initialize database
-init_db()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """One-time startup work, run after the event loop is up"""
+    validate_environment()
+    init_db()
+    yield
 
 # SAFETY CONFIGURATION - Use centralized config
 DEMO_MODE = config.DEMO_MODE
@@ -97,9 +125,22 @@ cors_origins = config.CORS_ORIGINS
 app = FastAPI(
     title="CodeChat API",
     description="HTTP API wrapper around the comprehensive CTF learning mentor and AI-powered development assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson also serializes datetimes natively
+    openapi_url=None if config.DISABLE_DOCS else "/openapi.json",
+    docs_url=None if config.DISABLE_DOCS else "/docs",
+    redoc_url=None if config.DISABLE_DOCS else "/redoc"
 )
 
+# Defer per-route dependant/field computation to first call. Caveat: route
+# schema errors surface on the first request instead of at import time.
+try:
+    from fastapi_deferred_init import DeferredAPIRoute
+    app.router.route_class = DeferredAPIRoute
+except ImportError:
+    pass  # optional speedup; eager APIRoute init is only a startup cost
+
 # Enable CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -109,15 +150,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Simple in-memory session storage (Phase 1)
-sessions = {}
-uploaded_files = {}
+# Anonymous sessions and upload metadata: Redis-backed when REDIS_URL is
+# set so state is shared across Uvicorn workers, per-process dicts otherwise
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+_redis_client = (aioredis.from_url(config.REDIS_URL)
+                 if aioredis is not None and config.REDIS_URL else None)
+sessions = SessionStore(_redis_client, "sess", ttl=3600)
+uploaded_files = SessionStore(_redis_client, "file", ttl=3600)
+
+# Created once at import; per-request os.makedirs was a wasted syscall
+_SESSION_DIR = os.path.join(tempfile.gettempdir(), "codechat_sessions")
+os.makedirs(_SESSION_DIR, exist_ok=True)
 
 def get_session_dir() -> str:
-    """Get or create session directory"""
-    session_dir = os.path.join(tempfile.gettempdir(), "codechat_sessions")
-    os.makedirs(session_dir, exist_ok=True)
-    return session_dir
+    """Get the session directory (created once at startup)"""
+    return _SESSION_DIR
+
+async def _persist_turn(user: Optional[dict], context_session: Optional[str], session_id: str,
+                        message: str, response_text: str, cost: float, role: Optional[str],
+                        messages: list) -> str:
+    """Persist one chat turn; returns the session id actually used
+
+    Authenticated users get a single database transaction (session create,
+    conversation append, stats update) run off the event loop; anonymous
+    users go to the shared session store for backward compatibility.
+    """
+    if user:
+        title = message[:50] + "..." if len(message) > 50 else message
+        return await asyncio.to_thread(
+            save_chat_turn, user["user_id"], context_session, title, message, response_text, cost
+        )
+
+    await sessions.set(session_id, {
+        "messages": messages,
+        "total_cost": cost,
+        "agent_used": role
+    })
+    return session_id
+
+def _read_files(file_paths: list) -> str:
+    """Concatenate referenced files into one prompt block"""
+    combined = io.StringIO()
+    for file_path in file_paths:
+        filename = os.path.basename(file_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                combined.write(f"\n=== {filename} ===\n{f.read()}\n")
+        except Exception as e:
+            combined.write(f"\n=== {filename} (Error) ===\nCould not read file: {e}\n")
+    return combined.getvalue()
+
+@functools.lru_cache(maxsize=256)
+def _read_files_lru(stat_key: tuple) -> str:
+    return _read_files([path for path, _ in stat_key])
+
+def _combine_files(file_paths: list) -> str:
+    """Combine files through an LRU keyed on (path, mtime), so follow-up
+    turns about the same upload skip the disk entirely (runs in a thread)"""
+    try:
+        stat_key = tuple((path, os.stat(path).st_mtime_ns) for path in file_paths)
+    except OSError:
+        # A file went missing; take the uncached path so the error text
+        # is rebuilt instead of memoized
+        return _read_files(file_paths)
+    return _read_files_lru(stat_key)
 
 def get_client_ip(request: Request) -> str:
     """Get client IP address (handles proxy headers)"""
@@ -140,7 +240,7 @@ async def root():
 @app.get("/api/status")
 async def get_status():
     """Public status endpoint for monitoring"""
-    status = rate_limiter.get_status()
+    status = get_rate_limiter().get_status()
     return {
         "status": "online",
         "mode": "demo" if DEMO_MODE else "full",
@@ -152,6 +252,8 @@ async def get_status():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    # One timestamp per response, not one per field
+    now_iso = datetime.now().isoformat()
     try:
         # Check database connection
         from database import get_user_by_id
@@ -159,61 +261,75 @@ async def health_check():
         test_query = get_user_by_id(1) if os.path.exists(os.getenv("DATABASE_PATH", "./data/sessions.db")) else None
         
         # Check rate limiter
-        if not hasattr(rate_limiter, 'check_limits'):
+        if not hasattr(get_rate_limiter(), 'check_limits'):
             raise Exception("Rate limiter not initialized")
         
         return {
             "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso,
             "version": "1.0.0",
             "mode": "demo" if DEMO_MODE else "full"
         }
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
-            content={"status": "unhealthy", "error": str(e), "timestamp": datetime.now().isoformat()}
+            content={"status": "unhealthy", "error": str(e), "timestamp": now_iso}
         )
 
 @app.get("/metrics")
 async def metrics():
     """Metrics endpoint for monitoring"""
+    # One get_status() call supplies every figure; no per-scrape recomputation
+    rate_limiter = get_rate_limiter()
+    status = rate_limiter.get_status()
+    daily_cost = status.get("daily_cost", 0.0)
     return {
         "timestamp": datetime.now().isoformat(),
         "requests": {
-            "total_daily": rate_limiter.daily_requests,
-            "requests_per_ip": len(rate_limiter.requests)
+            "total_daily": status.get("daily_requests", 0),
+            "unique_ips": status.get("unique_visitors", 0)
         },
         "costs": {
-            "daily_total": rate_limiter.daily_cost,
+            "daily_total": daily_cost,
             "daily_limit": rate_limiter.MAX_DAILY_COST,
-            "percentage_used": round((rate_limiter.daily_cost / rate_limiter.MAX_DAILY_COST * 100), 2) if rate_limiter.MAX_DAILY_COST > 0 else 0
+            "percentage_used": round((daily_cost / rate_limiter.MAX_DAILY_COST * 100), 2) if rate_limiter.MAX_DAILY_COST > 0 else 0
         },
         "mode": "demo" if DEMO_MODE else "full"
     }
 
+# AGENT_ROLES and the categories are static, so the response body is
+# serialized exactly once and replayed as raw bytes
+_agents_json: Optional[bytes] = None
+
 @app.get("/api/agents", response_model=AgentListResponse)
 async def list_agents():
     """List all available agent roles"""
-    agents = []
-    
-    # Categorize agents
-    categories = {
-        "Development": ["architect", "coder", "reviewer", "tester", "documenter", "optimizer"],
-        "Learning": ["mentor", "tutor", "clarifier"],
-        "Research": ["researcher"],
-        "CTF/Security": ["reverse-engineer", "crypto-analyst", "web-hacker", "forensics-expert", "exploit-dev"]
-    }
-    
-    for category, agent_names in categories.items():
-        for agent_name in agent_names:
-            if agent_name in AGENT_ROLES:
-                agents.append(AgentInfo(
-                    name=agent_name,
-                    description=AGENT_ROLES[agent_name]["description"],
-                    category=category
-                ))
-    
-    return AgentListResponse(agents=agents, total=len(agents))
+    global _agents_json
+    if _agents_json is None:
+        _load_codechat()
+        agents = []
+
+        # Categorize agents
+        categories = {
+            "Development": ["architect", "coder", "reviewer", "tester", "documenter", "optimizer"],
+            "Learning": ["mentor", "tutor", "clarifier"],
+            "Research": ["researcher"],
+            "CTF/Security": ["reverse-engineer", "crypto-analyst", "web-hacker", "forensics-expert", "exploit-dev"]
+        }
+
+        for category, agent_names in categories.items():
+            for agent_name in agent_names:
+                if agent_name in AGENT_ROLES:
+                    agents.append(AgentInfo(
+                        name=agent_name,
+                        description=AGENT_ROLES[agent_name]["description"],
+                        category=category
+                    ))
+
+        response = AgentListResponse(agents=agents, total=len(agents))
+        _agents_json = response.model_dump_json().encode()
+
+    return Response(content=_agents_json, media_type="application/json")
 
 # Authentication Endpoints
 @app.post("/api/auth/login", response_model=LoginResponse)
@@ -252,22 +368,25 @@ async def upload_file(file: UploadFile = File(...)):
         safe_filename = f"{file_id}_{file.filename}"
         file_path = os.path.join(get_session_dir(), safe_filename)
         
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
+        # Stream upload to disk in 64 KiB chunks so large files never sit
+        # in memory or block the event loop
+        size = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(1 << 16):
+                await buffer.write(chunk)
+                size += len(chunk)
+
         # Store file info
-        uploaded_files[file_id] = {
+        await uploaded_files.set(file_id, {
             "original_name": file.filename,
             "file_path": file_path,
-            "size": len(content)
-        }
-        
+            "size": size
+        })
+
         return UploadResponse(
             filename=file.filename,
             file_path=file_id,  # Return file_id for privacy
-            size=len(content),
+            size=size,
             success=True
         )
         
@@ -292,7 +411,7 @@ async def chat_endpoint(
     client_ip = get_client_ip(req)
     
     # Check rate limits
-    allowed, limit_message = rate_limiter.check_limits(client_ip)
+    allowed, limit_message = get_rate_limiter().check_limits(client_ip)
     if not allowed:
         raise HTTPException(status_code=429, detail=limit_message)
     
@@ -306,34 +425,22 @@ async def chat_endpoint(
         
         if request.files:
             for file_ref in request.files:
-                if file_ref in uploaded_files:
-                    file_info = uploaded_files[file_ref]
+                file_info = await uploaded_files.get(file_ref)
+                if file_info:
                     file_paths.append(file_info["file_path"])
         
-        # Read file content if files provided
+        # Read file content if files provided (off the event loop)
         if file_paths:
-            combined_content = ""
-            for file_path in file_paths:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        filename = os.path.basename(file_path)
-                        combined_content += f"\n=== {filename} ===\n{content}\n"
-                except Exception as e:
-                    combined_content += f"\n=== {os.path.basename(file_path)} (Error) ===\nCould not read file: {e}\n"
-            file_content = combined_content
+            file_content = await asyncio.to_thread(_combine_files, file_paths)
         
         # Get provider with environment-based API key
         api_key = get_api_key(request.provider)
         if not api_key:
-            # Try to fallback to any available key
-            for provider_name in ['anthropic', 'openai', 'google']:
-                fallback_key = get_api_key(provider_name)
-                if fallback_key:
-                    api_key = fallback_key
-                    request.provider = provider_name
-                    break
-            
+            # Fall back to the first provider with a configured key
+            if _DEFAULT_PROVIDER:
+                api_key = _API_KEYS[_DEFAULT_PROVIDER]
+                request.provider = _DEFAULT_PROVIDER
+
             if not api_key or DEMO_MODE or not ENABLE_API_CALLS:
                 # Use demo mode when: no API keys, DEMO_MODE is on, or API calls disabled
                 demo_provider = get_demo_provider()
@@ -343,24 +450,13 @@ async def chat_endpoint(
                 print(f"📝 Demo response for: {client_ip} - Role: {request.role}")
                 
                 # Handle user session persistence even in testing
-                if user:
-                    if not request.context_session:
-                        session_id = create_session(
-                            user["user_id"],
-                            title=request.message[:50] + "..." if len(request.message) > 50 else request.message
-                        )
-                    else:
-                        session_id = request.context_session
-                    
-                    add_to_conversation(session_id, request.message, mock_response, estimated_cost)
-                    update_user_stats(user["user_id"], estimated_cost)
-                else:
-                    sessions[session_id] = {
-                        "messages": [{"role": "user", "content": request.message}, {"role": "assistant", "content": mock_response}],
-                        "total_cost": estimated_cost,
-                        "agent_used": request.role
-                    }
-                
+                session_id = await _persist_turn(
+                    user, request.context_session, session_id,
+                    request.message, demo_response, estimated_cost, request.role,
+                    [{"role": "user", "content": request.message},
+                     {"role": "assistant", "content": demo_response}]
+                )
+
                 return ChatResponse(
                     response=demo_response,
                     agent_used=request.role or "coder",
@@ -371,10 +467,11 @@ async def chat_endpoint(
                 )
         
         # Only get provider if we have a valid API key
+        _load_codechat()
         provider = get_provider(request.provider, api_key)
         
         # Use the proven CLI chat function
-        response_text, messages = chat_about_code(
+        response_text, messages, estimated_cost = chat_about_code(
             provider=provider,
             question=request.message,
             code_content=file_content,
@@ -382,41 +479,20 @@ async def chat_endpoint(
             messages=None,  # TODO: Session persistence
             role=request.role
         )
-        
-        # Track cost (reuse CLI logic)
-        estimated_cost = COST_TRACKER.get("total_cost", 0.0)
-        
+
         # Add cost to rate limiter for tracking
-        rate_limiter.add_cost(estimated_cost)
+        get_rate_limiter().add_cost(estimated_cost)
         
         # Log the API call
         print(f"💰 API call from {client_ip}: ${estimated_cost:.4f} - Role: {request.role}")
         
         # Handle user session persistence
-        if user:
-            # Use database for authenticated users
-            if not request.context_session:
-                # Create new session for user
-                session_id = create_session(
-                    user["user_id"],
-                    title=request.message[:50] + "..." if len(request.message) > 50 else request.message
-                )
-            else:
-                session_id = request.context_session
-            
-            # Save conversation turn
-            add_to_conversation(session_id, request.message, response_text, estimated_cost)
-            
-            # Update user statistics
-            update_user_stats(user["user_id"], estimated_cost)
-        else:
-            # Store in memory for anonymous users (backward compatibility)
-            sessions[session_id] = {
-                "messages": messages or [],
-                "total_cost": estimated_cost,
-                "agent_used": request.role
-            }
-        
+        session_id = await _persist_turn(
+            user, request.context_session, session_id,
+            request.message, response_text, estimated_cost, request.role,
+            messages or []
+        )
+
         return ChatResponse(
             response=response_text,
             agent_used=request.role or "coder",
@@ -437,11 +513,94 @@ async def chat_endpoint(
             error=str(e)
         )
 
-# Session Management Endpoints  
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    req: Request,
+    user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """SSE variant of /api/chat - chunks are flushed as the provider emits them"""
+    client_ip = get_client_ip(req)
+
+    allowed, limit_message = get_rate_limiter().check_limits(client_ip)
+    if not allowed:
+        raise HTTPException(status_code=429, detail=limit_message)
+
+    session_id = request.context_session or str(uuid.uuid4())
+
+    file_paths = []
+    for file_ref in (request.files or []):
+        file_info = await uploaded_files.get(file_ref)
+        if file_info:
+            file_paths.append(file_info["file_path"])
+    file_content = await asyncio.to_thread(_combine_files, file_paths) if file_paths else None
+
+    api_key = get_api_key(request.provider)
+    if not api_key and _DEFAULT_PROVIDER:
+        api_key = _API_KEYS[_DEFAULT_PROVIDER]
+        request.provider = _DEFAULT_PROVIDER
+
+    use_demo = not api_key or DEMO_MODE or not ENABLE_API_CALLS
+
+    async def event_stream():
+        nonlocal session_id
+        chunks = []
+        messages = None
+        estimated_cost = 0.0
+        try:
+            if use_demo:
+                demo_response = DEMO_RESPONSES.get(request.role or "mentor", DEMO_RESPONSES["mentor"])
+                for i in range(0, len(demo_response), 256):
+                    chunk = demo_response[i:i + 256]
+                    chunks.append(chunk)
+                    yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            else:
+                _load_codechat()
+                provider = get_provider(request.provider, api_key)
+                messages, error = build_chat_messages(
+                    request.message,
+                    code_content=file_content,
+                    filepath=file_paths[0] if file_paths else None,
+                    messages=None,
+                    role=request.role
+                )
+                if error:
+                    yield f"data: {json.dumps({'error': error})}\n\n"
+                    return
+
+                async for chunk in iterate_in_threadpool(provider.stream(messages)):
+                    chunks.append(chunk)
+                    yield f"data: {json.dumps({'delta': chunk})}\n\n"
+
+                messages.append({"role": "assistant", "content": "".join(chunks)})
+                estimated_cost = getattr(provider, "last_request_cost", 0.0)
+                get_rate_limiter().add_cost(estimated_cost)
+
+            yield f"data: {json.dumps({'done': True, 'session_id': session_id, 'estimated_cost': estimated_cost})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            # Persist whatever made it to the client, even on disconnect.
+            # A disconnect cancels this task, so shield the write or the
+            # CancelledError would drop the turn as soon as it awaits.
+            response_text = "".join(chunks)
+            if response_text:
+                session_id = await asyncio.shield(_persist_turn(
+                    user, request.context_session, session_id,
+                    request.message, response_text, estimated_cost, request.role,
+                    messages or [{"role": "user", "content": request.message},
+                                 {"role": "assistant", "content": response_text}]
+                ))
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# Session Management Endpoints
 @app.get("/api/sessions", response_model=SessionListResponse)
 async def get_user_sessions_endpoint(user: dict = Depends(verify_token)):
     """Get user's conversation history"""
-    sessions_list = get_user_sessions(user["user_id"])
+    session_rows = get_user_sessions(user["user_id"])
+    # Rows are converted to dicts here, at the serialization boundary only
+    sessions_list = [dict(s) for s in session_rows]
     return SessionListResponse(sessions=sessions_list, total=len(sessions_list))
 
 @app.get("/api/sessions/{session_id}", response_model=SessionDetailResponse)
@@ -464,10 +623,9 @@ async def get_session_detail(session_id: str, user: dict = Depends(verify_token)
 @app.get("/api/session/{session_id}", response_model=SessionResponse)
 async def get_anonymous_session(session_id: str):
     """Get conversation history for anonymous session (backward compatibility)"""
-    if session_id not in sessions:
+    session = await sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    session = sessions[session_id]
     return SessionResponse(
         session_id=session_id,
         messages=session["messages"],
@@ -516,7 +674,16 @@ async def workflow_endpoint(request: WorkflowRequest):
             error=str(e)
         )
 
-# Admin endpoints with proper security
+# Admin endpoints with proper security.
+# Password bytes are interned once; compare_digest keeps the check constant-time.
+# A loaded secrets.json can lack admin_password, so fail closed on None
+# instead of crashing at import.
+_ADMIN_PW_BYTES = (config.ADMIN_PASSWORD or '').encode()
+
+def _check_admin(admin_token: str) -> None:
+    if not _ADMIN_PW_BYTES or not hmac.compare_digest(admin_token.encode(), _ADMIN_PW_BYTES):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
 class AdminRequest(BaseModel):
     admin_token: str
 
@@ -526,22 +693,23 @@ class AdminShutdownRequest(AdminRequest):
 @app.post("/api/admin/costs")
 async def get_admin_costs(request: AdminRequest):
     """Check current costs (admin only) - POST for security"""
-    if request.admin_token != config.ADMIN_PASSWORD:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-    
+    _check_admin(request.admin_token)
+
+    rate_limiter = get_rate_limiter()
+    status = rate_limiter.get_status()
+    daily_cost = status.get("daily_cost", 0.0)
     return {
-        "daily_cost": f"${rate_limiter.daily_cost:.4f}",
-        "daily_requests": rate_limiter.daily_requests,
+        "daily_cost": f"${daily_cost:.4f}",
+        "daily_requests": status.get("daily_requests", 0),
         "daily_limit": f"${rate_limiter.MAX_DAILY_COST:.2f}",
-        "percentage_used": f"{(rate_limiter.daily_cost / rate_limiter.MAX_DAILY_COST * 100):.1f}%",
-        "status": "🟢 Safe" if rate_limiter.daily_cost < 0.80 else "🔴 Warning"
+        "percentage_used": f"{(daily_cost / rate_limiter.MAX_DAILY_COST * 100):.1f}%",
+        "status": "🟢 Safe" if daily_cost < 0.80 else "🔴 Warning"
     }
 
 @app.post("/api/admin/shutdown")
 async def emergency_shutdown(request: AdminShutdownRequest):
     """Emergency kill switch for API calls"""
-    if request.admin_token != config.ADMIN_PASSWORD:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    _check_admin(request.admin_token)
     
     if not request.confirm:
         raise HTTPException(status_code=400, detail="Must confirm shutdown")
@@ -555,12 +723,21 @@ async def emergency_shutdown(request: AdminShutdownRequest):
 @app.post("/api/admin/reset-limits")
 async def reset_rate_limits(request: AdminRequest):
     """Reset rate limits (admin only)"""
-    if request.admin_token != config.ADMIN_PASSWORD:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    _check_admin(request.admin_token)
     
-    rate_limiter.reset_daily()
+    get_rate_limiter().reset_daily()
     return {"status": "Rate limits reset", "timestamp": datetime.now().isoformat()}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop/httptools roughly double loop throughput on IO-bound apps;
+    # scale WORKERS past 1 only with REDIS_URL set (shared session state)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WORKERS", "1")),
+        loop="uvloop",
+        http="httptools",
+        log_level="info"
+    )
\ No newline at end of file
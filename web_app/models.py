@@ -1,9 +1,35 @@
 """Pydantic models for request/response schemas"""
 from typing import Optional, List, Dict
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+# pydantic rejects typing.TypedDict on Python < 3.12; typing_extensions
+# ships with pydantic, so this works on the 3.11 base image
+from typing_extensions import TypedDict
 import uuid
 
+# Shared config for response-only models: they are built from trusted
+# internal data, so skip the validation features they never use
+_RESPONSE_CONFIG = ConfigDict(extra='ignore', validate_assignment=False)
+
+# Concrete shapes for what used to be anonymous dicts, so Pydantic
+# builds one core schema per type instead of re-walking dict fields
+class Message(TypedDict):
+    role: str
+    content: str
+
+class ConversationTurn(TypedDict):
+    timestamp: str
+    user_message: str
+    ai_response: str
+    cost: float
+
+class SessionSummary(TypedDict):
+    id: str
+    title: Optional[str]
+    created_at: str
+    last_updated: str
+    total_cost: float
+
 class ChatRequest(BaseModel):
     message: str
     role: Optional[str] = "coder"
@@ -16,6 +42,7 @@ class ChatRequest(BaseModel):
     collaborative: bool = False
 
 class ChatResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     response: str
     agent_used: str
     model_used: str
@@ -30,16 +57,19 @@ class AgentInfo(BaseModel):
     category: str
 
 class AgentListResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     agents: List[AgentInfo]
     total: int
 
 class SessionResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     session_id: str
-    messages: List[dict]
+    messages: List[Message]
     total_cost: float
     agent_usage: dict
 
 class UploadResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     filename: str
     file_path: str
     size: int
@@ -51,6 +81,7 @@ class WorkflowRequest(BaseModel):
     session_id: Optional[str] = None
 
 class WorkflowResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     workflow_name: str
     steps_completed: int
     outputs: List[str]
@@ -83,11 +114,13 @@ class LoginRequest(BaseModel):
     email: str
 
 class LoginResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     token: str
     user: Dict
     success: bool = True
 
 class UserResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     user_id: str
     email: str
     total_questions: int
@@ -95,12 +128,14 @@ class UserResponse(BaseModel):
     subscription_tier: str
 
 class SessionListResponse(BaseModel):
-    sessions: List[Dict]
+    model_config = _RESPONSE_CONFIG
+    sessions: List[SessionSummary]
     total: int
 
 class SessionDetailResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
     id: str
-    conversation: List[Dict]
+    conversation: List[ConversationTurn]
     total_cost: float
     created_at: datetime
     title: Optional[str] = None
\ No newline at end of file
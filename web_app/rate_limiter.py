@@ -1,18 +1,73 @@
 """Rate limiting and cost protection for Nathan - Safety first!"""
 
-from datetime import datetime, timedelta
-from collections import defaultdict
+from array import array
+from datetime import datetime
+from threading import Thread
+import atexit
 import json
 import os
+import time
+
+# How often the background task writes dirty state to disk
+FLUSH_INTERVAL_SECONDS = 5
+
+# Sliding-window widths in seconds (rings hold time.monotonic() floats)
+_HOUR = 3600.0
+_DAY = 86400.0
+
+class _IPWindow:
+    """Fixed-size ring of monotonic timestamps for one IP
+
+    Raw 8-byte doubles in a flat array instead of a container of Python
+    float objects - contiguous, cache-friendly, and allocation-free after
+    construction. Capacity equals the per-IP daily cap, so the ring can
+    never wrap past entries that still count against a limit.
+    """
+    __slots__ = ("buf", "start", "count")
+
+    def __init__(self, capacity: int):
+        self.buf = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def prune(self, cutoff: float):
+        """Drop entries at or before cutoff from the head of the ring"""
+        buf, cap = self.buf, len(self.buf)
+        while self.count and buf[self.start] <= cutoff:
+            self.start = (self.start + 1) % cap
+            self.count -= 1
+
+    def append(self, ts: float):
+        cap = len(self.buf)
+        self.buf[(self.start + self.count) % cap] = ts
+        if self.count == cap:
+            self.start = (self.start + 1) % cap  # full: overwrite oldest
+        else:
+            self.count += 1
+
+    def count_newer(self, cutoff: float) -> int:
+        """Binary-search the time-ordered ring for entries after cutoff"""
+        buf, cap = self.buf, len(self.buf)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if buf[(self.start + mid) % cap] <= cutoff:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.count - lo
 
 class RateLimiter:
     """Protect against abuse and control costs"""
-    
+
     def __init__(self):
-        self.requests = defaultdict(list)
+        # Per-IP 24h sliding windows as compact timestamp rings; the
+        # hourly count is a binary search within the same ring
+        self.requests = {}  # ip -> _IPWindow
         self.daily_cost = 0.0
         self.daily_requests = 0
         self.last_reset = datetime.now()
+        self._dirty = False
         
         # STRICT LIMITS FOR SAFETY - Configurable via environment
         self.MAX_REQUESTS_PER_IP_HOUR = int(os.getenv("MAX_REQUESTS_PER_IP_HOUR", "10"))
@@ -22,13 +77,22 @@ class RateLimiter:
         
         # Load saved state if exists
         self.load_state()
+
+        # Don't lose in-flight counters on clean shutdown
+        atexit.register(self.save_state)
+
+        # Background flush so the hot path never touches disk; atexit
+        # still covers whatever is dirty at shutdown
+        Thread(target=self._flush_loop, daemon=True).start()
     
     def check_limits(self, client_ip: str) -> tuple[bool, str]:
         """Check if request is allowed"""
-        now = datetime.now()
-        
+        # Monotonic floats on the hot path; datetime only for the
+        # user-facing daily reset bookkeeping
+        now = time.monotonic()
+
         # Reset daily counters if new day
-        if (now - self.last_reset).days >= 1:
+        if (datetime.now() - self.last_reset).days >= 1:
             self.reset_daily()
         
         # Check daily totals
@@ -39,18 +103,17 @@ class RateLimiter:
             return False, f"Daily request limit reached ({self.MAX_DAILY_REQUESTS}). Try tomorrow!"
         
         # Check IP limits
-        hour_ago = now - timedelta(hours=1)
-        day_ago = now - timedelta(days=1)
-        
-        # Clean old requests
-        self.requests[client_ip] = [
-            req for req in self.requests[client_ip]
-            if req > day_ago
-        ]
-        
-        # Count recent requests
-        hourly = sum(1 for req in self.requests[client_ip] if req > hour_ago)
-        daily = len(self.requests[client_ip])
+        hour_ago = now - _HOUR
+        day_ago = now - _DAY
+
+        window = self.requests.get(client_ip)
+        if window is None:
+            window = self.requests[client_ip] = _IPWindow(self.MAX_REQUESTS_PER_IP_DAY)
+
+        # Age out expired entries, then count both windows from one ring
+        window.prune(day_ago)
+        daily = window.count
+        hourly = window.count_newer(hour_ago)
         
         if hourly >= self.MAX_REQUESTS_PER_IP_HOUR:
             return False, f"Too many requests ({hourly}/{self.MAX_REQUESTS_PER_IP_HOUR} per hour). Try again later!"
@@ -58,17 +121,17 @@ class RateLimiter:
         if daily >= self.MAX_REQUESTS_PER_IP_DAY:
             return False, f"Daily limit reached ({daily}/{self.MAX_REQUESTS_PER_IP_DAY} per day). Try again tomorrow!"
         
-        # Request allowed
-        self.requests[client_ip].append(now)
+        # Request allowed - mark state dirty; the flush loop persists it
+        window.append(now)
         self.daily_requests += 1
-        self.save_state()
-        
+        self._dirty = True
+
         return True, "OK"
-    
+
     def add_cost(self, cost: float):
         """Track costs"""
         self.daily_cost += cost
-        self.save_state()
+        self._dirty = True
         
         # Emergency warning
         if self.daily_cost > (self.MAX_DAILY_COST * 0.8):
@@ -80,12 +143,13 @@ class RateLimiter:
         self.daily_requests = 0
         self.last_reset = datetime.now()
         self.requests.clear()
-        self.save_state()
+        self._dirty = True
         print(f"✅ Daily limits reset at {self.last_reset}")
     
     def get_status(self) -> dict:
         """Get current status"""
         return {
+            "active_ips": len(self.requests),
             "daily_cost": round(self.daily_cost, 3),
             "daily_cost_limit": self.MAX_DAILY_COST,
             "daily_requests": self.daily_requests,
@@ -101,6 +165,13 @@ class RateLimiter:
             }
         }
     
+    def _flush_loop(self):
+        """Persist dirty state every few seconds from a daemon thread"""
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            if self._dirty:
+                self.save_state()
+
     def save_state(self):
         """Save state to file for persistence across restarts"""
         state_file = "/tmp/nathan_rate_limiter_state.json"
@@ -110,8 +181,12 @@ class RateLimiter:
                 "daily_requests": self.daily_requests,
                 "last_reset": self.last_reset.isoformat()
             }
-            with open(state_file, 'w') as f:
+            # Atomic write so a crash mid-flush can't corrupt the state file
+            tmp_file = state_file + ".tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(state, f)
+            os.replace(tmp_file, state_file)
+            self._dirty = False
         except Exception as e:
             print(f"Warning: Could not save rate limiter state: {e}")
     
@@ -1,201 +1,420 @@
 """Persistent rate limiter using SQLite for production safety"""
+import atexit
+import functools
 import os
 import sqlite3
-import json
+import time
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, deque
 import logging
-from threading import Lock
+from contextlib import contextmanager
+from queue import Queue
+from threading import Lock, Thread
 
 logger = logging.getLogger(__name__)
 
+# Audit-row batching: how often the background thread flushes queued
+# request rows, and the queue bound past which we fall back to a
+# synchronous insert rather than grow without limit
+FLUSH_INTERVAL_SECONDS = 0.5
+PENDING_MAX = 1024
+
+# Read-only connections for status queries; in WAL mode readers never
+# wait behind the single writer
+READER_POOL_SIZE = min(4, os.cpu_count() or 1)
+
+# Hot-path SQL as module constants: sqlite3 caches the compiled program
+# per connection keyed on the exact statement text, so reusing the same
+# string objects skips re-parsing on every request
+_Q_GET_STATS = "SELECT total_requests, total_cost FROM daily_stats WHERE date = ?"
+_Q_NEW_STATS = "INSERT INTO daily_stats (date) VALUES (?)"
+_Q_GET_IP_COUNTS = (
+    "SELECT hour_start, hour_count, day_start, day_count FROM ip_counts WHERE ip = ?"
+)
+_Q_UPSERT_IP_COUNTS = """
+    INSERT INTO ip_counts (ip, hour_start, hour_count, day_start, day_count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(ip) DO UPDATE SET
+        hour_start = excluded.hour_start,
+        hour_count = excluded.hour_count,
+        day_start = excluded.day_start,
+        day_count = excluded.day_count
+"""
+_Q_LOG_REQUEST = "INSERT INTO requests (ip_address, timestamp) VALUES (?, ?)"
+_Q_MARK_IP_SEEN = "INSERT OR IGNORE INTO ips_today (date, ip) VALUES (?, ?)"
+_Q_BUMP_UNIQUE = "UPDATE daily_stats SET unique_ips = unique_ips + 1 WHERE date = ?"
+# Chunked via a rowid subquery because DELETE ... LIMIT needs a
+# non-default SQLite compile flag
+_Q_DELETE_OLD_REQUESTS = (
+    "DELETE FROM requests WHERE rowid IN"
+    " (SELECT rowid FROM requests WHERE timestamp < ? LIMIT ?)"
+)
+CLEANUP_CHUNK_ROWS = 1000
+_Q_BUMP_STATS = (
+    "UPDATE daily_stats SET total_requests = total_requests + ?, last_updated = ? WHERE date = ?"
+)
+
 class PersistentRateLimiter:
     """Rate limiter with SQLite persistence to survive restarts"""
-    
+
     def __init__(self, db_path: str = None):
         self.db_path = db_path or os.getenv("RATE_LIMIT_DB", "/var/nathan/rate_limits.db")
         self.lock = Lock()
-        
+
         # Configuration from environment with safe defaults
         self.MAX_REQUESTS_PER_IP_HOUR = int(os.getenv("MAX_REQUESTS_PER_IP_HOUR", "10"))
         self.MAX_REQUESTS_PER_IP_DAY = int(os.getenv("MAX_REQUESTS_PER_IP_DAY", "50"))
         self.MAX_DAILY_COST = float(os.getenv("MAX_DAILY_COST", "1.00"))
         self.MAX_DAILY_REQUESTS = int(os.getenv("MAX_DAILY_REQUESTS", "200"))
-        
+
+        # One long-lived connection reused for every operation: opening per
+        # call re-reads the WAL headers and re-applies PRAGMAs each time.
+        # Autocommit mode (isolation_level=None); self.lock serializes
+        # access across threads, hence check_same_thread=False.
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._writer = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+
         # Initialize database
         self._init_db()
-        
+
         # Clean old data on startup
         self._cleanup_old_data()
-    
+
+        # Pool of read-only connections: status queries check one out
+        # instead of contending for the writer and its lock
+        self._readers = Queue()
+        for _ in range(READER_POOL_SIZE):
+            reader = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            reader.execute("PRAGMA busy_timeout=5000")
+            reader.execute("PRAGMA cache_size=-20000")
+            reader.execute("PRAGMA mmap_size=268435456")
+            self._readers.put(reader)
+
+        # Warm standby for when SQLite is unavailable: per-(ip, hour)
+        # buckets so an outage degrades to in-memory hourly limiting
+        # instead of waving everything through
+        self._fallback = Counter()
+        self.locked_errors = 0
+
+        # Audit rows are queued here and flushed in batches off the hot
+        # path; the limit decision itself reads ip_counts, not this queue
+        self._pending = deque()
+        atexit.register(self._flush_pending)
+        Thread(target=self._flush_loop, daemon=True).start()
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a read-only connection from the pool"""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def _flush_loop(self):
+        """Flush queued audit rows every few hundred milliseconds"""
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            if self._pending:
+                self._flush_pending()
+
+    def _flush_pending(self):
+        """Write all queued request rows in one batched transaction"""
+        with self.lock:
+            if not self._pending:
+                return
+            batch = [self._pending.popleft() for _ in range(len(self._pending))]
+            try:
+                conn = self._writer
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(_Q_LOG_REQUEST, batch)
+                    # Batches can straddle midnight, so bump per date
+                    per_day = {}
+                    for _, ts in batch:
+                        day = datetime.fromtimestamp(ts).date().isoformat()
+                        per_day[day] = per_day.get(day, 0) + 1
+                    now_ts = int(time.time())
+                    for day, count in per_day.items():
+                        conn.execute(_Q_BUMP_STATS, (count, now_ts, day))
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            except Exception as e:
+                logger.error(f"Failed to flush request batch: {e}")
+
     def _init_db(self):
         """Initialize SQLite database with required tables"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("PRAGMA journal_mode=WAL")  # Better concurrent access
-            conn.execute("PRAGMA synchronous=NORMAL")  # Balance safety/speed
-            
-            # Table for tracking requests
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS requests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ip_address TEXT NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_ip_time (ip_address, timestamp)
-                )
-            """)
-            
-            # Table for daily statistics
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS daily_stats (
-                    date DATE PRIMARY KEY,
-                    total_requests INTEGER DEFAULT 0,
-                    total_cost REAL DEFAULT 0.0,
-                    unique_ips INTEGER DEFAULT 0,
-                    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create indexes for performance
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_ip ON requests(ip_address)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_time ON requests(timestamp)")
-            
-            conn.commit()
-    
+        conn = self._writer
+
+        # On a fresh database, opt into incremental vacuum so space
+        # reclamation can happen in small bounded steps during cleanup.
+        # Must be the first pragma - it only takes effect before the
+        # database header is written.
+        if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+        conn.execute("PRAGMA journal_mode=WAL")  # Better concurrent access
+        conn.execute("PRAGMA synchronous=NORMAL")  # Balance safety/speed
+        conn.execute("PRAGMA busy_timeout=5000")  # Wait instead of SQLITE_BUSY
+        conn.execute("PRAGMA cache_size=-20000")  # 20 MiB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")  # Sorters/temp tables in RAM
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB memory-mapped reads
+        conn.execute("PRAGMA foreign_keys=ON")
+
+        # Table for tracking requests. Timestamps are integer unix
+        # epochs: fixed-width, compared without per-row ISO-text parsing,
+        # and roughly half the bytes of the old DATETIME text. Audit rows
+        # only live a week, so a legacy text-timestamp table is simply
+        # rebuilt rather than migrated.
+        legacy = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='requests'"
+        ).fetchone()
+        if legacy and "DATETIME" in legacy[0]:
+            conn.execute("DROP TABLE requests")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ip_address TEXT NOT NULL,
+                timestamp INTEGER NOT NULL DEFAULT (unixepoch())
+            )
+        """)
+
+        # Table for daily statistics. WITHOUT ROWID stores rows directly
+        # in the primary-key B-tree, saving a rowid-index indirection on
+        # the hot per-day row; last_updated is an integer epoch.
+        self._ensure_without_rowid(conn, "daily_stats", """
+            CREATE TABLE daily_stats (
+                date TEXT PRIMARY KEY,
+                total_requests INTEGER NOT NULL DEFAULT 0,
+                total_cost REAL NOT NULL DEFAULT 0.0,
+                unique_ips INTEGER NOT NULL DEFAULT 0,
+                last_updated INTEGER
+            ) WITHOUT ROWID
+        """)
+
+        # First-seen tracking per day: lets daily_stats.unique_ips be
+        # maintained incrementally instead of a COUNT(DISTINCT) scan
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ips_today (
+                date TEXT NOT NULL,
+                ip TEXT NOT NULL,
+                PRIMARY KEY (date, ip)
+            ) WITHOUT ROWID
+        """)
+
+        # Running per-IP window counters so the hot path does point
+        # lookups instead of COUNT(*) range scans over request history
+        self._ensure_without_rowid(conn, "ip_counts", """
+            CREATE TABLE ip_counts (
+                ip TEXT PRIMARY KEY,
+                hour_start INTEGER NOT NULL,
+                hour_count INTEGER NOT NULL DEFAULT 0,
+                day_start INTEGER NOT NULL,
+                day_count INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+
+        # Composite index covers the (ip, time-range) lookups; a plain
+        # timestamp index serves the cleanup and per-day range scans.
+        # A single-column ip index would be redundant with the composite.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_requests_ip_time"
+            " ON requests(ip_address, timestamp DESC)"
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_requests_ip")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_time ON requests(timestamp)")
+
+    @staticmethod
+    def _ensure_without_rowid(conn, table: str, create_sql: str):
+        """Create a table, rebuilding any legacy rowid version in place"""
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name = ?",
+            (table,)
+        ).fetchone()
+        if row is None:
+            conn.execute(create_sql)
+        elif "WITHOUT ROWID" not in row[0].upper():
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            conn.execute(create_sql)
+            conn.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+            conn.execute(f"DROP TABLE {table}_old")
+
     def check_limits(self, client_ip: str) -> tuple[bool, str]:
         """Check if request from IP is allowed"""
-        with self.lock:
-            try:
-                with sqlite3.connect(self.db_path) as conn:
-                    now = datetime.now()
-                    today = now.date()
-                    hour_ago = now - timedelta(hours=1)
-                    day_ago = now - timedelta(days=1)
-                    
-                    # Get or create today's stats
-                    stats = conn.execute(
-                        "SELECT total_requests, total_cost FROM daily_stats WHERE date = ?",
-                        (today,)
-                    ).fetchone()
-                    
-                    if not stats:
-                        conn.execute(
-                            "INSERT INTO daily_stats (date) VALUES (?)",
-                            (today,)
-                        )
-                        conn.commit()
-                        daily_requests = 0
-                        daily_cost = 0.0
-                    else:
-                        daily_requests, daily_cost = stats
-                    
-                    # Check daily limits
-                    if daily_cost >= self.MAX_DAILY_COST:
-                        logger.warning(f"Daily cost limit hit: ${daily_cost:.2f}")
-                        return False, f"Daily cost limit reached (${self.MAX_DAILY_COST:.2f}). Nathan needs rest!"
-                    
-                    if daily_requests >= self.MAX_DAILY_REQUESTS:
-                        logger.warning(f"Daily request limit hit: {daily_requests}")
-                        return False, f"Daily request limit reached ({self.MAX_DAILY_REQUESTS}). Try tomorrow!"
-                    
-                    # Count IP-specific requests
-                    hourly_count = conn.execute(
-                        "SELECT COUNT(*) FROM requests WHERE ip_address = ? AND timestamp > ?",
-                        (client_ip, hour_ago)
-                    ).fetchone()[0]
-                    
-                    daily_count = conn.execute(
-                        "SELECT COUNT(*) FROM requests WHERE ip_address = ? AND timestamp > ?",
-                        (client_ip, day_ago)
-                    ).fetchone()[0]
-                    
-                    # Check IP limits
-                    if hourly_count >= self.MAX_REQUESTS_PER_IP_HOUR:
-                        return False, f"Too many requests ({self.MAX_REQUESTS_PER_IP_HOUR}/hour limit). Try again later!"
-                    
-                    if daily_count >= self.MAX_REQUESTS_PER_IP_DAY:
-                        return False, f"Daily limit reached ({self.MAX_REQUESTS_PER_IP_DAY}/day). Try tomorrow!"
-                    
-                    # Request allowed - record it
-                    conn.execute(
-                        "INSERT INTO requests (ip_address, timestamp) VALUES (?, ?)",
-                        (client_ip, now)
-                    )
-                    
-                    # Update daily stats
-                    conn.execute(
-                        "UPDATE daily_stats SET total_requests = total_requests + 1, last_updated = ? WHERE date = ?",
-                        (now, today)
-                    )
-                    
-                    conn.commit()
-                    
-                    # Calculate remaining requests
-                    remaining_hourly = self.MAX_REQUESTS_PER_IP_HOUR - hourly_count - 1
-                    remaining_daily = self.MAX_REQUESTS_PER_IP_DAY - daily_count - 1
-                    
-                    return True, f"OK (Remaining: {remaining_hourly}/hour, {remaining_daily}/day)"
-                    
-            except Exception as e:
-                logger.error(f"Rate limiter error: {e}")
-                # Fail open in case of database issues (be lenient)
-                return True, "OK (rate limiter error, allowing request)"
-    
+        # Clock reads and window arithmetic stay outside the critical
+        # section; self.lock covers only the write transaction itself.
+        # Dates are bound as ISO strings - the implicit date adapter is
+        # deprecated since Python 3.12.
+        now = datetime.now()
+        today = now.date().isoformat()
+        now_ts = int(now.timestamp())
+        try:
+            with self.lock:
+                conn = self._writer
+                # BEGIN IMMEDIATE takes the write lock up front so the
+                # whole check-and-record sequence is one transaction and
+                # can never deadlock on a read-to-write lock upgrade
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = self._check_and_record(conn, client_ip, now_ts, today)
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            return result
+
+        except sqlite3.OperationalError as e:
+            # Database locked or unreachable - fall back to the
+            # in-memory window rather than failing fully open, and
+            # count the event so outages are visible in get_status.
+            # Anything other than an OperationalError propagates.
+            self.locked_errors += 1
+            logger.error(f"Rate limiter database error: {e}")
+            return self._check_fallback(client_ip)
+
+    def _check_fallback(self, client_ip: str) -> tuple[bool, str]:
+        """Hourly in-memory limit used while the database is down"""
+        bucket = int(time.time()) // 3600
+        if len(self._fallback) > 4096:
+            self._fallback = Counter(
+                {k: v for k, v in self._fallback.items() if k[1] >= bucket}
+            )
+        key = (client_ip, bucket)
+        if self._fallback[key] >= self.MAX_REQUESTS_PER_IP_HOUR:
+            return False, f"Too many requests ({self.MAX_REQUESTS_PER_IP_HOUR}/hour limit). Try again later!"
+        self._fallback[key] += 1
+        return True, "OK (rate limiter degraded, in-memory window)"
+
+    def _check_and_record(self, conn, client_ip: str, now_ts: int, today: str) -> tuple[bool, str]:
+        """Limit decision plus bookkeeping, run inside one transaction"""
+        # Get or create today's stats
+        stats = conn.execute(_Q_GET_STATS, (today,)).fetchone()
+
+        if not stats:
+            conn.execute(_Q_NEW_STATS, (today,))
+            daily_requests = 0
+            daily_cost = 0.0
+        else:
+            daily_requests, daily_cost = stats
+
+        # Queued audit rows haven't hit daily_stats yet; count them so a
+        # flush lag can't let requests slip past the daily cap
+        daily_requests += len(self._pending)
+
+        # Check daily limits
+        if daily_cost >= self.MAX_DAILY_COST:
+            logger.warning(f"Daily cost limit hit: ${daily_cost:.2f}")
+            return False, f"Daily cost limit reached (${self.MAX_DAILY_COST:.2f}). Nathan needs rest!"
+
+        if daily_requests >= self.MAX_DAILY_REQUESTS:
+            logger.warning(f"Daily request limit hit: {daily_requests}")
+            return False, f"Daily request limit reached ({self.MAX_DAILY_REQUESTS}). Try tomorrow!"
+
+        # Per-IP counters: a single point lookup, with windows that
+        # reset a fixed period after their first request
+        row = conn.execute(_Q_GET_IP_COUNTS, (client_ip,)).fetchone()
+
+        if row:
+            hour_start, hourly_count, day_start, daily_count = row
+            if now_ts - hour_start >= 3600:
+                hour_start, hourly_count = now_ts, 0
+            if now_ts - day_start >= 86400:
+                day_start, daily_count = now_ts, 0
+        else:
+            hour_start = day_start = now_ts
+            hourly_count = daily_count = 0
+
+        # Check IP limits
+        if hourly_count >= self.MAX_REQUESTS_PER_IP_HOUR:
+            return False, f"Too many requests ({self.MAX_REQUESTS_PER_IP_HOUR}/hour limit). Try again later!"
+
+        if daily_count >= self.MAX_REQUESTS_PER_IP_DAY:
+            return False, f"Daily limit reached ({self.MAX_REQUESTS_PER_IP_DAY}/day). Try tomorrow!"
+
+        # Request allowed - bump the counters and keep the detail row
+        # for auditing (no longer read on the hot path)
+        conn.execute(
+            _Q_UPSERT_IP_COUNTS,
+            (client_ip, hour_start, hourly_count + 1, day_start, daily_count + 1)
+        )
+
+        # First request from this IP today bumps the unique counter
+        if conn.execute(_Q_MARK_IP_SEEN, (today, client_ip)).rowcount == 1:
+            conn.execute(_Q_BUMP_UNIQUE, (today,))
+        if len(self._pending) < PENDING_MAX:
+            self._pending.append((client_ip, now_ts))
+        else:
+            # Queue overflowing - take the synchronous path instead
+            conn.execute(_Q_LOG_REQUEST, (client_ip, now_ts))
+            conn.execute(_Q_BUMP_STATS, (1, now_ts, today))
+
+        # Calculate remaining requests
+        remaining_hourly = self.MAX_REQUESTS_PER_IP_HOUR - hourly_count - 1
+        remaining_daily = self.MAX_REQUESTS_PER_IP_DAY - daily_count - 1
+
+        return True, f"OK (Remaining: {remaining_hourly}/hour, {remaining_daily}/day)"
+
     def add_cost(self, cost: float):
         """Track API costs"""
+        # One clock read per call, taken before the lock
+        now = datetime.now()
+        today = now.date().isoformat()
         with self.lock:
             try:
-                with sqlite3.connect(self.db_path) as conn:
-                    today = datetime.now().date()
-                    conn.execute(
-                        "UPDATE daily_stats SET total_cost = total_cost + ?, last_updated = ? WHERE date = ?",
-                        (cost, datetime.now(), today)
-                    )
-                    conn.commit()
-                    
-                    # Get updated total
-                    total = conn.execute(
-                        "SELECT total_cost FROM daily_stats WHERE date = ?",
-                        (today,)
-                    ).fetchone()[0]
-                    
-                    logger.info(f"Cost added: ${cost:.4f}, Daily total: ${total:.4f}")
-                    
-                    # Warning if approaching limit
-                    if total > self.MAX_DAILY_COST * 0.8:
-                        logger.warning(f"⚠️ COST WARNING: ${total:.2f} of ${self.MAX_DAILY_COST:.2f} daily limit")
-                        
+                conn = self._writer
+                conn.execute(
+                    "UPDATE daily_stats SET total_cost = total_cost + ?, last_updated = ? WHERE date = ?",
+                    (cost, int(now.timestamp()), today)
+                )
+
+                # Get updated total
+                total = conn.execute(
+                    "SELECT total_cost FROM daily_stats WHERE date = ?",
+                    (today,)
+                ).fetchone()[0]
+
+                logger.info(f"Cost added: ${cost:.4f}, Daily total: ${total:.4f}")
+
+                # Warning if approaching limit
+                if total > self.MAX_DAILY_COST * 0.8:
+                    logger.warning(f"⚠️ COST WARNING: ${total:.2f} of ${self.MAX_DAILY_COST:.2f} daily limit")
+
             except Exception as e:
                 logger.error(f"Failed to track cost: {e}")
-    
+
     def get_status(self) -> dict:
         """Get current rate limiter status"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                today = datetime.now().date()
+            # Read-only path: borrow from the reader pool so status
+            # queries never queue behind the writer lock
+            with self._reader() as conn:
+                today = datetime.now().date().isoformat()
                 stats = conn.execute(
                     "SELECT total_requests, total_cost, unique_ips FROM daily_stats WHERE date = ?",
                     (today,)
                 ).fetchone()
-                
+
                 if stats:
                     requests, cost, unique_ips = stats
                 else:
                     requests = cost = unique_ips = 0
-                
-                # Count unique IPs today
-                unique_ips = conn.execute(
-                    "SELECT COUNT(DISTINCT ip_address) FROM requests WHERE DATE(timestamp) = ?",
-                    (today,)
-                ).fetchone()[0]
-                
+
+                # unique_ips comes straight from daily_stats: it is kept
+                # current by the first-seen bump in the check path, so no
+                # DISTINCT scan over request history is needed here
                 return {
                     "daily_requests": requests,
                     "daily_cost": round(cost, 4),
                     "unique_visitors": unique_ips,
                     "requests_remaining": max(0, self.MAX_DAILY_REQUESTS - requests),
                     "cost_remaining": round(max(0, self.MAX_DAILY_COST - cost), 2),
+                    "locked_errors": self.locked_errors,
                     "limits": {
                         "per_ip_hour": self.MAX_REQUESTS_PER_IP_HOUR,
                         "per_ip_day": self.MAX_REQUESTS_PER_IP_DAY,
@@ -206,63 +425,95 @@ class PersistentRateLimiter:
         except Exception as e:
             logger.error(f"Failed to get status: {e}")
             return {"error": str(e)}
-    
+
     def reset_daily(self):
         """Reset daily counters (for manual reset or cron job)"""
         with self.lock:
             try:
-                with sqlite3.connect(self.db_path) as conn:
-                    today = datetime.now().date()
-                    
-                    # Log before reset
-                    stats = conn.execute(
-                        "SELECT total_requests, total_cost FROM daily_stats WHERE date = ?",
-                        (today,)
-                    ).fetchone()
-                    
-                    if stats:
-                        logger.info(f"Daily reset - Requests: {stats[0]}, Cost: ${stats[1]:.4f}")
-                    
-                    # Create new day entry
-                    conn.execute(
-                        "INSERT OR REPLACE INTO daily_stats (date, total_requests, total_cost) VALUES (?, 0, 0)",
-                        (today,)
-                    )
-                    
-                    # Clean old request records (keep 7 days)
-                    week_ago = datetime.now() - timedelta(days=7)
-                    conn.execute("DELETE FROM requests WHERE timestamp < ?", (week_ago,))
-                    
-                    conn.commit()
-                    logger.info("Daily limits reset successfully")
-                    
+                conn = self._writer
+                now = datetime.now()
+                today = now.date().isoformat()
+
+                # Log before reset
+                stats = conn.execute(
+                    "SELECT total_requests, total_cost FROM daily_stats WHERE date = ?",
+                    (today,)
+                ).fetchone()
+
+                if stats:
+                    logger.info(f"Daily reset - Requests: {stats[0]}, Cost: ${stats[1]:.4f}")
+
+                # Create new day entry
+                conn.execute(
+                    "INSERT OR REPLACE INTO daily_stats (date, total_requests, total_cost) VALUES (?, 0, 0)",
+                    (today,)
+                )
+
+                # Clear today's first-seen marks so unique_ips can
+                # rebuild from zero
+                conn.execute("DELETE FROM ips_today WHERE date = ?", (today,))
+
+                # Clean old request records (keep 7 days)
+                week_ago = int(now.timestamp()) - 7 * 86400
+                self._delete_old_requests(conn, week_ago)
+
+                logger.info("Daily limits reset successfully")
+
             except Exception as e:
                 logger.error(f"Failed to reset daily limits: {e}")
-    
+
+    @staticmethod
+    def _delete_old_requests(conn, cutoff: int) -> int:
+        """Delete expired audit rows in bounded chunks.
+
+        Each chunk is its own autocommit statement, so the write lock is
+        released between chunks instead of being held for one huge
+        DELETE that also bloats the WAL.
+        """
+        deleted = 0
+        while True:
+            rows = conn.execute(
+                _Q_DELETE_OLD_REQUESTS, (cutoff, CLEANUP_CHUNK_ROWS)
+            ).rowcount
+            deleted += rows
+            if rows < CLEANUP_CHUNK_ROWS:
+                return deleted
+
     def _cleanup_old_data(self):
         """Clean up old data on startup"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.lock:
+                conn = self._writer
+                now = datetime.now()
+
                 # Remove requests older than 7 days
-                week_ago = datetime.now() - timedelta(days=7)
-                deleted = conn.execute(
-                    "DELETE FROM requests WHERE timestamp < ?",
-                    (week_ago,)
-                ).rowcount
-                
+                week_ago = int(now.timestamp()) - 7 * 86400
+                deleted = self._delete_old_requests(conn, week_ago)
+
                 # Remove stats older than 30 days
-                month_ago = datetime.now().date() - timedelta(days=30)
+                month_ago = (now.date() - timedelta(days=30)).isoformat()
                 conn.execute("DELETE FROM daily_stats WHERE date < ?", (month_ago,))
-                
-                # VACUUM to reclaim space
-                conn.execute("VACUUM")
-                conn.commit()
-                
+
+                # First-seen rows only matter for the current day
+                conn.execute("DELETE FROM ips_today WHERE date < ?", (now.date().isoformat(),))
+
+                # Reclaim a bounded number of freed pages instead of a
+                # full VACUUM, which rewrites the whole file and would
+                # stall startup in proportion to database size
+                conn.execute("PRAGMA incremental_vacuum(1000)")
+
                 if deleted > 0:
                     logger.info(f"Cleaned up {deleted} old request records")
-                    
+
         except Exception as e:
             logger.error(f"Cleanup failed: {e}")
 
-# Global instance
-rate_limiter = PersistentRateLimiter()
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_rate_limiter() -> PersistentRateLimiter:
+    """Shared limiter, built on first use.
+
+    Constructing at import time opened SQLite, created tables, and ran
+    cleanup before the app could serve, and a pre-fork handle would be
+    shared across gunicorn workers (WAL state must not cross a fork).
+    """
+    return PersistentRateLimiter()
@@ -0,0 +1,33 @@
+"""Shared storage for anonymous sessions and upload metadata"""
+from typing import Optional
+
+import orjson
+
+class SessionStore:
+    """Key-value store backed by Redis when available.
+
+    With REDIS_URL configured every Uvicorn worker sees the same state, so
+    the app can scale past one process. Without it, entries live in a
+    per-process dict exactly as before (single-worker only).
+    """
+
+    def __init__(self, redis_client, prefix: str, ttl: int = 3600):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._ttl = ttl
+        self._local = {}
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        if self._redis is not None:
+            raw = await self._redis.get(self._key(key))
+            return orjson.loads(raw) if raw is not None else None
+        return self._local.get(key)
+
+    async def set(self, key: str, value: dict):
+        if self._redis is not None:
+            await self._redis.setex(self._key(key), self._ttl, orjson.dumps(value))
+        else:
+            self._local[key] = value
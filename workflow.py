@@ -3,125 +3,364 @@
 Simple workflow runner for codechat - chains multiple agent calls
 """
 
+import functools
 import os
+import re
 import sys
 import yaml
 import subprocess
-import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
+from threading import Lock, Thread
+
+@dataclass(frozen=True, slots=True)
+class Step:
+    """One resolved workflow step; attribute access beats repeated dict
+    lookups in the execution loops and slots keep instances small"""
+    index: int
+    id: str
+    role: str
+    prompt: str
+    input: str
+    output: str
+    code_only: bool
+    skip_planning: bool
+    auto_doc: bool
+    depends_on: tuple
+
+# Compiled once; applied to string leaf values instead of re-stringifying
+# every step dict and substring-scanning it per keyword
+DANGER_RE = re.compile(r"\b(exec|eval|os\.system|__import__)\b", re.IGNORECASE)
+
+def _iter_string_values(obj):
+    """Yield every string leaf in a nested dict/list structure"""
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from _iter_string_values(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            yield from _iter_string_values(value)
+
+@functools.lru_cache(maxsize=32)
+def _load_workflow_cached(path, mtime_ns):
+    """Parse workflow YAML; mtime_ns keys the cache so edits reload"""
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
+
+def load_workflow(workflow_file):
+    """Load a workflow file, skipping the YAML re-parse on repeated runs"""
+    return _load_workflow_cached(
+        os.path.abspath(workflow_file), os.stat(workflow_file).st_mtime_ns
+    )
+
+def _step_id(step, index):
+    """Identifier used by depends_on; explicit 'id' or the 1-based position"""
+    return step.get('id', f"step{index}")
+
+def _step_deps(step):
+    """Normalized depends_on list for a step"""
+    deps = step.get('depends_on', [])
+    if isinstance(deps, str):
+        deps = [deps]
+    return deps
 
 def validate_workflow(workflow):
     """Validate workflow to prevent security issues"""
     valid_roles = ['clarifier', 'architect', 'coder', 'reviewer', 'tester', 'documenter', 'optimizer', 'researcher']
-    
-    for step in workflow.get('steps', []):
+
+    steps = workflow.get('steps', [])
+    for step in steps:
         # Validate role
         if 'role' in step and step['role'] not in valid_roles:
             raise ValueError(f"Invalid role: {step['role']}")
-        
+
         # Validate no shell commands
-        if any(danger in str(step).lower() for danger in ['exec', 'eval', 'os.system', '__import__']):
-            raise ValueError("Potential code execution detected in workflow")
-            
+        for value in _iter_string_values(step):
+            if DANGER_RE.search(value):
+                raise ValueError("Potential code execution detected in workflow")
+
         # Validate file paths don't escape
         for field in ['input', 'output']:
             if field in step and '..' in str(step[field]):
                 raise ValueError(f"Path traversal detected in {field}")
-    
+
+    # Validate the dependency graph: references must exist and the
+    # graph must be acyclic (checked with Kahn's algorithm)
+    ids = {_step_id(step, i) for i, step in enumerate(steps, 1)}
+    indegree = {}
+    dependents = {}
+    for i, step in enumerate(steps, 1):
+        sid = _step_id(step, i)
+        deps = _step_deps(step)
+        for dep in deps:
+            if dep not in ids:
+                raise ValueError(f"Unknown depends_on reference: {dep}")
+            dependents.setdefault(dep, []).append(sid)
+        indegree[sid] = len(deps)
+    ready = [sid for sid, n in indegree.items() if n == 0]
+    seen = 0
+    while ready:
+        sid = ready.pop()
+        seen += 1
+        for child in dependents.get(sid, []):
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+    if seen != len(steps):
+        raise ValueError("Dependency cycle detected in workflow steps")
+
+    return True
+
+def _build_plan(workflow):
+    """One pass over the raw step list.
+
+    Produces the resolved Step records, the output-file list for the
+    completion report, whether any step declares dependencies, and
+    whether the planning-first warning applies - instead of re-walking
+    the raw dicts once per concern.
+    """
+    auto_document = workflow.get('auto_document', False)
+    plan = []
+    outputs = []
+    has_deps = False
+    for i, raw in enumerate(workflow['steps'], 1):
+        deps = tuple(_step_deps(raw))
+        has_deps = has_deps or bool(deps)
+        step = Step(
+            index=i,
+            id=_step_id(raw, i),
+            role=raw.get('role'),
+            prompt=raw['prompt'],
+            input=raw.get('input'),
+            output=raw.get('output'),
+            code_only=bool(raw.get('code_only')),
+            skip_planning=bool(raw.get('skip_planning')),
+            auto_doc=(raw.get('role') == 'coder' and auto_document),
+            depends_on=deps,
+        )
+        plan.append(step)
+        if step.output:
+            outputs.append(step.output)
+    needs_planning_warning = bool(plan) and plan[0].role == 'coder'
+    return plan, outputs, has_deps, needs_planning_warning
+
+def _run_step_subprocess(step, context_file, api_key):
+    """Fallback: run one step through the codechat CLI in a subprocess"""
+    cmd = ['python3', 'codechat.py', step.prompt]
+
+    # Add skip-planning flag if explicitly set in workflow
+    if step.skip_planning:
+        cmd.append('--skip-planning')
+
+    # Auto-add documentation step after coder
+    if step.auto_doc:
+        cmd.append('--auto-doc')
+
+    # Add role
+    if step.role:
+        cmd.extend(['-r', step.role])
+
+    # Add input file if specified
+    if step.input:
+        cmd.extend(['-f', step.input])
+
+    # Add output file if specified
+    if step.output:
+        cmd.extend(['-o', step.output])
+        if step.code_only:
+            cmd.append('--code-only')
+
+    # Add context to maintain conversation
+    cmd.extend(['-c', context_file])
+
+    # Add API key if provided
+    if api_key:
+        cmd.extend(['--api-key', api_key])
+
+    print(f"Running: {' '.join(cmd[:5])}...")
+
+    # Stream output as it arrives instead of buffering whole responses
+    # in memory with capture_output; long model outputs show progress
+    # and peak RSS stays flat
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+    )
+
+    def drain(pipe, sink):
+        for line in pipe:
+            sink.write(line)
+            sink.flush()
+        pipe.close()
+
+    drainers = [
+        Thread(target=drain, args=(proc.stdout, sys.stdout)),
+        Thread(target=drain, args=(proc.stderr, sys.stderr)),
+    ]
+    for t in drainers:
+        t.start()
+    returncode = proc.wait()
+    for t in drainers:
+        t.join()
+
+    if returncode != 0:
+        print(f"Error in step {step.index} (exit code {returncode})", file=sys.stderr)
+        return False
+
+    return True
+
+def _execute_dag(plan, codechat, api_key):
+    """Run steps concurrently, submitting each once its dependencies finish.
+
+    The workload is I/O-bound on API calls, so threads give near-linear
+    speedup for independent steps (e.g. several reviewers over the same
+    code). A step inherits conversation context from its last-listed
+    dependency; console output is serialized with a lock so step logs
+    don't interleave.
+    """
+    print_lock = Lock()
+
+    def run_step(step, messages):
+        with print_lock:
+            print(f"\nStep {step.index}: {step.role or 'default'} role")
+            print(f"Prompt: {step.prompt[:100]}...")
+        response, updated = codechat.run(
+            step.prompt,
+            role=step.role,
+            input_files=[step.input] if step.input else None,
+            output=step.output,
+            code_only=step.code_only,
+            messages=messages,
+            api_key=api_key,
+            auto_doc=step.auto_doc,
+        )
+        with print_lock:
+            print(response)
+            if step.output:
+                print(f"Output saved to: {step.output}")
+        return updated
+
+    pending = {step.index: step for step in plan}
+    results = {}  # step id -> messages after that step
+    running = {}  # future -> step
+    with ThreadPoolExecutor(max_workers=min(len(plan), 8)) as pool:
+        while pending or running:
+            for i in sorted(pending):
+                step = pending[i]
+                if all(dep in results for dep in step.depends_on):
+                    messages = list(results[step.depends_on[-1]]) if step.depends_on else []
+                    fut = pool.submit(run_step, step, messages)
+                    running[fut] = step
+                    del pending[i]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                step = running.pop(fut)
+                try:
+                    results[step.id] = fut.result()
+                except Exception as e:
+                    print(f"Error in step {step.index}: {e}", file=sys.stderr)
+                    return False
     return True
 
 def run_workflow(workflow_file, api_key=None):
     """Run a workflow of multiple agent steps"""
-    
-    # Load workflow with safe loader
-    with open(workflow_file, 'r') as f:
-        workflow = yaml.safe_load(f)
-    
+
+    # Load workflow with safe loader (parse cached across repeated runs)
+    workflow = load_workflow(workflow_file)
+
     # Validate before running
     try:
         validate_workflow(workflow)
     except ValueError as e:
         print(f"ERROR: Invalid workflow - {e}", file=sys.stderr)
         return False
-    
+
     print(f"Running workflow: {workflow['name']}")
     print("-" * 50)
-    
-    # Keep conversation context across steps
+
+    # Run steps in-process when codechat is importable: no fork/exec or
+    # interpreter startup per step, and conversation context stays in
+    # memory instead of round-tripping through a JSON file each step
+    try:
+        import codechat
+    except Exception as e:
+        codechat = None
+        print(f"Note: codechat not importable ({e}), running steps via subprocess",
+              file=sys.stderr)
+
+    # Conversation context: in-memory across in-process steps, a JSON
+    # file for the subprocess fallback
+    messages = []
     context_file = f"{workflow_file}.context.json"
-    
+
+    # One pass over the raw steps resolves the execution plan, output
+    # list, dependency flag, and planning warning together
+    plan, outputs, has_deps, needs_planning_warning = _build_plan(workflow)
+
     # Check for planning-first enforcement
-    first_step = workflow['steps'][0] if workflow['steps'] else None
-    if first_step and first_step.get('role') == 'coder':
+    if needs_planning_warning:
         print("WARNING: Workflow starts with 'coder' role without architect/planning step!")
         print("Consider adding an architect step first for better results.")
         response = input("Continue anyway? (y/n): ")
         if response.lower() != 'y':
             return False
-    
-    for i, step in enumerate(workflow['steps'], 1):
-        print(f"\nStep {i}: {step.get('role', 'default')} role")
-        print(f"Prompt: {step['prompt'][:100]}...")
-        
-        # Build command
-        cmd = ['python3', 'codechat.py', step['prompt']]
-        
-        # Add skip-planning flag if explicitly set in workflow
-        if step.get('skip_planning'):
-            cmd.append('--skip-planning')
-        
-        # Auto-add documentation step after coder
-        if step.get('role') == 'coder' and workflow.get('auto_document', False):
-            # Mark this step for auto-documentation
-            cmd.append('--auto-doc')
-        
-        # Add role
-        if 'role' in step:
-            cmd.extend(['-r', step['role']])
-        
-        # Add input file if specified
-        if 'input' in step:
-            cmd.extend(['-f', step['input']])
-        
-        # Add output file if specified
-        if 'output' in step:
-            cmd.extend(['-o', step['output']])
-            if step.get('code_only'):
-                cmd.append('--code-only')
-        
-        # Add context to maintain conversation
-        cmd.extend(['-c', context_file])
-        
-        # Add API key if provided
-        if api_key:
-            cmd.extend(['--api-key', api_key])
-        
-        # Run the command
-        print(f"Running: {' '.join(cmd[:5])}...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"Error in step {i}:")
-            print(result.stderr)
+
+    # Workflows that declare dependencies run through the DAG executor
+    # so independent steps overlap; plain workflows stay sequential with
+    # linear context chaining
+    if has_deps and codechat is not None:
+        if not _execute_dag(plan, codechat, api_key):
             return False
-        
-        print(result.stdout)
-        
-        if 'output' in step:
-            print(f"Output saved to: {step['output']}")
-    
+        return _finish_workflow(outputs)
+    if has_deps:
+        print("Note: depends_on requires in-process execution; running sequentially",
+              file=sys.stderr)
+
+    for step in plan:
+        print(f"\nStep {step.index}: {step.role or 'default'} role")
+        print(f"Prompt: {step.prompt[:100]}...")
+
+        if codechat is not None:
+            try:
+                response, messages = codechat.run(
+                    step.prompt,
+                    role=step.role,
+                    input_files=[step.input] if step.input else None,
+                    output=step.output,
+                    code_only=step.code_only,
+                    messages=messages,
+                    api_key=api_key,
+                    auto_doc=step.auto_doc,
+                )
+            except Exception as e:
+                print(f"Error in step {step.index}: {e}", file=sys.stderr)
+                return False
+            print(response)
+        elif not _run_step_subprocess(step, context_file, api_key):
+            return False
+
+        if step.output:
+            print(f"Output saved to: {step.output}")
+
+    return _finish_workflow(outputs)
+
+def _finish_workflow(outputs):
+    """Completion banner and generated-file listing shared by both executors"""
     print("\n" + "=" * 50)
     print("Workflow completed successfully!")
-    
-    # List generated files
-    outputs = [step.get('output') for step in workflow['steps'] if 'output' in step]
+
+    # List generated files (one stat per file; exists+getsize would be two)
     if outputs:
         print("\nGenerated files:")
         for output in outputs:
-            if os.path.exists(output):
-                size = os.path.getsize(output)
-                print(f"  - {output} ({size} bytes)")
-    
+            try:
+                size = os.stat(output).st_size
+            except OSError:
+                continue
+            print(f"  - {output} ({size} bytes)")
+
     return True
 
 if __name__ == '__main__':